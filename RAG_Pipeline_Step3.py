@@ -4,9 +4,12 @@ import os
 import nltk
 import faiss
 import numpy as np
-import google.generativeai as genai
 from bs4 import BeautifulSoup
 
+from dedup import dedup_chunks
+from fact_table import load_fact_table
+from gemini_client import get_client
+
 nltk.download('punkt')
 
 # ===  Load and Clean Text ===
@@ -39,20 +42,15 @@ def chunk_text(text, chunk_size=1000, chunk_overlap=200):
 
 # === Get Embeddings from Gemini ===
 #The get_google_embeddings function generates Google Gemini embeddings for each text chunk using the embedding-001 model. 
-# It configures the API with the provided key, sends each non-empty chunk for embedding (optimized for retrieval tasks), 
+# It uses the shared client for the provided key, sends each non-empty chunk for embedding (optimized for retrieval tasks), 
 # and collects the resulting vectors into a NumPy array
 def get_google_embeddings(chunks, api_key):
-    genai.configure(api_key=api_key)
+    client = get_client(api_key)
     embeddings = []
     for chunk in chunks:
         if not chunk.strip():
             continue
-        response = genai.embed_content(
-            model="models/embedding-001",
-            content=chunk,
-            task_type="retrieval_document"
-        )
-        embeddings.append(response["embedding"])
+        embeddings.append(client.embed(chunk, task_type="retrieval_document"))
     return np.array(embeddings).astype('float32')
 
 # === Build FAISS Index ===
@@ -65,15 +63,10 @@ def build_faiss_index(embeddings):
 
 # === Embed the Query and Retrieve Chunks ===
 def embed_query(query, api_key):
-    genai.configure(api_key=api_key)
     if not query.strip():
         raise ValueError("Query cannot be empty.")
-    response = genai.embed_content(
-        model="models/embedding-001",
-        content=query,
-        task_type="retrieval_query"
-    )
-    return np.array([response["embedding"]]).astype('float32')
+    embedding = get_client(api_key).embed(query, task_type="retrieval_query")
+    return np.array([embedding]).astype('float32')
 
 
 # The retrieve_chunks function performs a semantic search by querying the FAISS index with a 
@@ -86,8 +79,6 @@ def retrieve_chunks(query_embedding, faiss_index, chunks, top_k=5):
 
 # === Ask Gemini LLM ===
 def ask_gemini(question, context_chunks, api_key):
-    genai.configure(api_key=api_key)
-    model = genai.GenerativeModel("gemini-1.5-flash")
     context = "\n\n".join(context_chunks)
     prompt = f"""
 "You are an assistant for question-answering tasks. "
@@ -102,11 +93,17 @@ Context:
 Question:
 {question}
 """
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return get_client(api_key).generate(prompt)
 
 # ===  Full RAG Pipeline ===
-def rag_pipeline(question, file_path, api_key):
+def rag_pipeline(question, file_path, api_key, fact_table=None):
+    # Questions about a single structured fact (e.g. personal loan tenure) are answered
+    # straight from the fact table; everything else goes through retrieval and Gemini.
+    if fact_table is not None:
+        answer = fact_table.answer(question)
+        if answer:
+            return answer
+
     text = load_and_clean_text(file_path)
     chunks = chunk_text(text)
 
@@ -118,6 +115,9 @@ def rag_pipeline(question, file_path, api_key):
     if not chunks:
         raise ValueError("No valid text chunks found in the document.")
 
+    # Drop near-duplicate chunks (repeated boilerplate) before paying for their embeddings
+    chunks, _ = dedup_chunks(chunks)
+
     embeddings = get_google_embeddings(chunks, api_key)
     if embeddings.shape[0] == 0:
         raise ValueError("No embeddings could be created.")
@@ -143,7 +143,7 @@ if __name__ == "__main__":
         print("❌ Question cannot be empty.")
     else:
         try:
-            answer = rag_pipeline(question, file_path, api_key)
+            answer = rag_pipeline(question, file_path, api_key, load_fact_table())
             print("\nAnswer:\n", answer)
         except Exception as e:
             print("❌ Error:", e)
@@ -67,7 +67,7 @@ class BankOfMaharashtraLoanScraper:
                 'basic_info': {
                     'name': loan_name,
                     'category': loan_category,
-                 
+                    'url': url,
                 },
                 
                 'financial_details': self.extract_financial_info(full_text, soup),
@@ -125,12 +125,12 @@ class BankOfMaharashtraLoanScraper:
             rates.extend(matches)
         financial_info['interest_rates'] = list(set(rates))
         
-        # Loan amounts
+        # Loan amounts (kept with their currency, so rupee amounts can be told apart from other numbers)
         amount_patterns = [
-            r'(?:maximum|max|up to|loan amount).*?(?:rs\.?|₹)\s*(\d+(?:,\d+)*(?:\.\d+)?\s*(?:lakh|crore)?)',
-            r'(?:rs\.?|₹)\s*(\d+(?:,\d+)*\s*(?:lakh|crore))',
+            r'(?:maximum|max|up to|loan amount).*?((?:rs\.?|₹)\s*\d+(?:,\d+)*(?:\.\d+)?\s*(?:lakh|crore)?)',
+            r'((?:rs\.?|₹)\s*\d+(?:,\d+)*\s*(?:lakh|crore))',
             r'(\d+\s*(?:lakh|crore))',
-            r'(?:minimum|min).*?(?:rs\.?|₹)\s*(\d+(?:,\d+)*)'
+            r'(?:minimum|min).*?((?:rs\.?|₹)\s*\d+(?:,\d+)*)'
         ]
         
         amounts = []
@@ -142,7 +142,7 @@ class BankOfMaharashtraLoanScraper:
         # Tenure/Duration
         tenure_patterns = [
             r'(?:tenure|repayment period|loan period|duration).*?(\d+\s*(?:years?|months?))',
-            r'(?:up to)\s*(\d+\s*years?)',
+            r'(?:up to)\s*(\d+\s*years?\b)(?!\s*(?:of age|old))',
             r'(\d+\s*years?\s*tenure)',
             r'(\d+-\d+\s*years?)'
         ]
@@ -468,12 +468,21 @@ class BankOfMaharashtraLoanScraper:
         print(f"Complete data saved to {filename}")
         print(f"File size: {os.path.getsize(filename) / 1024:.1f} KB")
 
+# save_to_json keeps the structured fields (financial details, eligibility, ...) per scheme,
+# which the fact table in fact_table.py is built from
+    def save_to_json(self, filename='scraped_data_mahaloan2.json'):
+        with open(filename, 'w', encoding='utf-8') as f:
+            json.dump(self.loan_schemes, f, ensure_ascii=False, indent=2)
+
+        print(f"Structured data saved to {filename}")
+
 if __name__ == "__main__":
     scraper = BankOfMaharashtraLoanScraper("chromedriver.exe")
     
     loans = scraper.scrape_all_loans()
     
     scraper.save_to_txt()
+    scraper.save_to_json()
     
     print(f"Scraping completed! Total schemes: {len(loans)}")
     print("All data saved file")
\ No newline at end of file
@@ -1,18 +1,48 @@
 # streamlit_app.py
 
+import os
 import streamlit as st
 import nltk
 import numpy as np
-import faiss
 from bs4 import BeautifulSoup
-import google.generativeai as genai
+from dedup import dedup_chunks
+from fact_table import load_fact_table
+from gemini_client import get_client
+from shared_index import SharedIndexReader
+from sharded_index import ShardedCorpus, unique_shard_name
 
 nltk.download("punkt")
 from nltk.tokenize import sent_tokenize
 
 # --- Gemini API Key ---
 GEMINI_API_KEY = " "  # Replace with your real key
-genai.configure(api_key=GEMINI_API_KEY)
+client = get_client(GEMINI_API_KEY)
+
+# Structured facts exported by the scraper, used to answer rate/tenure/amount questions directly.
+# Kept once per process, so the hit rate in the sidebar counts the questions of every session.
+@st.cache_resource
+def get_fact_table():
+    return load_fact_table()
+
+fact_table = get_fact_table()
+
+# --- Shared Index Mode ---
+# When RAG_SHARED_INDEX_DIR is set, every worker process attaches to the index published there
+# (see shared_index.py) instead of indexing uploaded files; one reader is kept per process.
+SHARED_INDEX_DIR = os.environ.get("RAG_SHARED_INDEX_DIR")
+
+@st.cache_resource
+def get_shared_index(shared_dir):
+    return SharedIndexReader(shared_dir)
+
+# A failed attach is not cached, so the app picks the index up on the next rerun once it is published
+shared_index = None
+shared_index_error = None
+if SHARED_INDEX_DIR:
+    try:
+        shared_index = get_shared_index(SHARED_INDEX_DIR)
+    except (FileNotFoundError, RuntimeError) as e:
+        shared_index_error = str(e)
 
 # === Load and Clean Text ===
 def load_and_clean_text(text):
@@ -43,38 +73,16 @@ def get_google_embeddings(chunks):
     for chunk in chunks:
         if not chunk.strip():
             continue
-        response = genai.embed_content(
-            model="models/embedding-001",
-            content=chunk,
-            task_type="retrieval_document"
-        )
-        embeddings.append(response["embedding"])
+        embeddings.append(client.embed(chunk, task_type="retrieval_document"))
     return np.array(embeddings).astype("float32")
 
-# === Build FAISS Index ===
-def build_faiss_index(embeddings):
-    dim = embeddings.shape[1]
-    index = faiss.IndexFlatL2(dim)
-    index.add(embeddings)
-    return index
-
 # === Embed Query ===
 def embed_query(query):
-    response = genai.embed_content(
-        model="models/embedding-001",
-        content=query,
-        task_type="retrieval_query"
-    )
-    return np.array([response["embedding"]]).astype("float32")
-
-# === Retrieve Chunks ===
-def retrieve_chunks(query_embedding, faiss_index, chunks, top_k=5):
-    distances, indices = faiss_index.search(query_embedding, top_k)
-    return [chunks[i] for i in indices[0] if i < len(chunks)]
+    embedding = client.embed(query, task_type="retrieval_query")
+    return np.array([embedding]).astype("float32")
 
 # === Ask Gemini ===
 def ask_gemini(question, context_chunks):
-    model = genai.GenerativeModel("gemini-1.5-flash")
     context = "\n\n".join(context_chunks)
     prompt = f"""
 You are an assistant for question-answering tasks.
@@ -88,35 +96,66 @@ Question:
 
 Answer in 3 sentences or fewer.
 """
-    response = model.generate_content(prompt)
-    return response.text.strip()
+    return client.generate(prompt)
 
 # === Streamlit UI ===
 st.set_page_config(page_title="Loan RAG QA App", page_icon="💬")
 st.title("🔍 Loan Q&A Assistant (Gemini + FAISS)")
 
-uploaded_file = st.file_uploader("Upload a cleaned `.txt` file", type="txt")
+if shared_index_error:
+    st.error(f"RAG_SHARED_INDEX_DIR is set but the shared index could not be opened: {shared_index_error}")
+    st.stop()
+
+uploaded_files = st.file_uploader("Upload cleaned `.txt` files", type="txt", accept_multiple_files=True)
 question = st.text_input("Ask your loan-related question:")
+fast_answer = fact_table.answer(question) if fact_table and question.strip() else None
 
-if uploaded_file and question.strip():
+if fact_table:
+    stats = fact_table.stats()
+    st.sidebar.caption(
+        f"Fact-table fast path: {stats['hits']} of {stats['lookups']} questions "
+        f"answered directly ({fact_table.hit_rate():.0%})"
+    )
+
+if fast_answer:
+    st.success("✅ Answer:")
+    st.write(fast_answer)
+elif shared_index is not None and question.strip():
     with st.spinner("Processing..."):
-        raw_text = uploaded_file.read().decode("utf-8")
-        clean_text = load_and_clean_text(raw_text)
-        chunks = chunk_text(clean_text)
-        
-        if not chunks:
-            st.error("No valid chunks could be created from this document.")
+        relevant_chunks = shared_index.retrieve_chunks(embed_query(question))
+        if not relevant_chunks:
+            st.warning("No relevant information found.")
         else:
-            embeddings = get_google_embeddings(chunks)
-            index = build_faiss_index(embeddings)
-            query_embedding = embed_query(question)
-            relevant_chunks = retrieve_chunks(query_embedding, index, chunks)
-
-            if not relevant_chunks:
-                st.warning("No relevant information found.")
+            st.success("✅ Answer:")
+            st.write(ask_gemini(question, relevant_chunks))
+elif uploaded_files and question.strip():
+    with st.spinner("Processing..."):
+        # One shard per uploaded document; the question is searched across all of them
+        corpus = ShardedCorpus()
+        try:
+            for uploaded_file in uploaded_files:
+                raw_text = uploaded_file.read().decode("utf-8")
+                clean_text = load_and_clean_text(raw_text)
+                chunks = [c for c in chunk_text(clean_text) if c.strip()]
+                if chunks:
+                    chunks, _ = dedup_chunks(chunks)
+                    name = unique_shard_name(uploaded_file.name, corpus.shards)
+                    corpus.add_shard(name, chunks, get_google_embeddings(chunks))
+
+            if not len(corpus):
+                st.error("No valid chunks could be created from these documents.")
             else:
-                answer = ask_gemini(question, relevant_chunks)
-                st.success("✅ Answer:")
-                st.write(answer)
+                query_embedding = embed_query(question)
+                relevant_chunks = corpus.retrieve_chunks(query_embedding)
+
+                if not relevant_chunks:
+                    st.warning("No relevant information found.")
+                else:
+                    answer = ask_gemini(question, relevant_chunks)
+                    st.success("✅ Answer:")
+                    st.write(answer)
+        finally:
+            # release the search thread pool even when embedding or generation fails
+            corpus.close()
 else:
-    st.info("Please upload a file and enter a question to begin.")
+    st.info("Please upload one or more files and enter a question to begin.")
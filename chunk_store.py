@@ -0,0 +1,187 @@
+import os
+import sys
+import json
+import zlib
+import numpy as np
+
+# === Compact Chunk Store ===
+# The chunk store replaces the plain Python list of chunk strings that retrieve_chunks indexes into.
+# All chunk text lives in one contiguous blob (text.bin), an offsets array (offsets.npy, n + 1 entries)
+# marks where each chunk starts and ends, and optional metadata columns are kept as one .npy array each.
+# Everything is opened memory-mapped, so only the pages for the chunks actually looked up are read.
+#
+# Layout of a store directory:
+#   manifest.json      -> chunk count, compression flag, metadata column names
+#   text.bin           -> concatenated UTF-8 chunk bytes (each chunk zlib-compressed if compress=True)
+#   offsets.npy        -> uint64 byte offsets into text.bin
+#   meta_<name>.npy    -> one metadata value per chunk
+
+MANIFEST_FILE = "manifest.json"
+TEXT_FILE = "text.bin"
+OFFSETS_FILE = "offsets.npy"
+EMBEDDINGS_FILE = "embeddings.npy"
+EMBEDDING_SCALES_FILE = "embedding_scales.npy"
+
+
+# The build_chunk_store function writes chunks (and optional metadata columns, e.g. {"doc_id": [...]})
+# to store_dir. Chunks are compressed one by one so that any single chunk can still be decoded on its own.
+def build_chunk_store(chunks, store_dir, compress=False, metadata=None):
+    metadata = metadata or {}
+    for name, values in metadata.items():
+        if len(values) != len(chunks):
+            raise ValueError(f"Metadata column '{name}' has {len(values)} values for {len(chunks)} chunks.")
+
+    os.makedirs(store_dir, exist_ok=True)
+    offsets = np.zeros(len(chunks) + 1, dtype=np.uint64)
+
+    with open(os.path.join(store_dir, TEXT_FILE), "wb") as f:
+        for i, chunk in enumerate(chunks):
+            data = chunk.encode("utf-8")
+            if compress:
+                data = zlib.compress(data)
+            f.write(data)
+            offsets[i + 1] = offsets[i] + len(data)
+
+    np.save(os.path.join(store_dir, OFFSETS_FILE), offsets)
+    for name, values in metadata.items():
+        np.save(os.path.join(store_dir, f"meta_{name}.npy"), np.asarray(values))
+
+    manifest = {
+        "num_chunks": len(chunks),
+        "compressed": compress,
+        "metadata_columns": sorted(metadata),
+    }
+    with open(os.path.join(store_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2)
+
+    return ChunkStore(store_dir)
+
+
+# ChunkStore behaves like the read-only list of chunks the pipeline already uses (len() and store[i]),
+# so it can be passed straight to retrieve_chunks in place of the list.
+class ChunkStore:
+    def __init__(self, store_dir):
+        self.store_dir = store_dir
+        with open(os.path.join(store_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            self.manifest = json.load(f)
+
+        self.compressed = self.manifest["compressed"]
+        self.offsets = np.load(os.path.join(store_dir, OFFSETS_FILE), mmap_mode="r")
+
+        text_path = os.path.join(store_dir, TEXT_FILE)
+        # np.memmap cannot map an empty file, so an empty store keeps an empty buffer instead
+        if os.path.getsize(text_path) > 0:
+            self.text = np.memmap(text_path, dtype=np.uint8, mode="r")
+        else:
+            self.text = np.zeros(0, dtype=np.uint8)
+
+        self.metadata = {
+            name: np.load(os.path.join(store_dir, f"meta_{name}.npy"), mmap_mode="r")
+            for name in self.manifest["metadata_columns"]
+        }
+
+    def __len__(self):
+        return self.manifest["num_chunks"]
+
+    def __getitem__(self, i):
+        if i < 0:
+            i += len(self)
+        if not 0 <= i < len(self):
+            raise IndexError("chunk id out of range")
+        start, end = int(self.offsets[i]), int(self.offsets[i + 1])
+        data = self.text[start:end].tobytes()
+        if self.compressed:
+            data = zlib.decompress(data)
+        return data.decode("utf-8")
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def get_metadata(self, i, name):
+        return self.metadata[name][i].item()
+
+    def nbytes_on_disk(self):
+        return sum(
+            os.path.getsize(os.path.join(self.store_dir, name))
+            for name in os.listdir(self.store_dir)
+        )
+
+
+# === Reduced-Precision Embeddings ===
+# Once the FAISS index is built the raw embeddings are not needed to answer queries,
+# so they can be archived at lower precision. float16 halves the size; int8 quarters it
+# by storing one float32 scale per row (symmetric quantization: value ~= int8 * scale).
+def save_embeddings(embeddings, store_dir, dtype="float16"):
+    embeddings = np.asarray(embeddings, dtype=np.float32)
+    os.makedirs(store_dir, exist_ok=True)
+
+    if dtype == "float16":
+        np.save(os.path.join(store_dir, EMBEDDINGS_FILE), embeddings.astype(np.float16))
+    elif dtype == "int8":
+        scales = np.abs(embeddings).max(axis=1) / 127.0
+        scales[scales == 0] = 1.0
+        quantized = np.round(embeddings / scales[:, None]).astype(np.int8)
+        np.save(os.path.join(store_dir, EMBEDDINGS_FILE), quantized)
+        np.save(os.path.join(store_dir, EMBEDDING_SCALES_FILE), scales.astype(np.float32))
+    else:
+        raise ValueError(f"Unsupported embedding dtype: {dtype}")
+
+
+# load_embeddings returns float32 embeddings (e.g. to rebuild the FAISS index),
+# dequantizing int8 storage with the saved per-row scales.
+def load_embeddings(store_dir):
+    stored = np.load(os.path.join(store_dir, EMBEDDINGS_FILE), mmap_mode="r")
+    if stored.dtype == np.int8:
+        scales = np.load(os.path.join(store_dir, EMBEDDING_SCALES_FILE))
+        return stored.astype(np.float32) * scales[:, None]
+    return stored.astype(np.float32)
+
+
+# === Memory Report ===
+# The estimate_memory_per_million function compares today's layout (a list of str objects plus a
+# float32 embeddings array held next to the index) against the chunk store, using a sample of real chunks.
+# Python list layout: 8-byte list slot + str object header + characters, per chunk.
+# Chunk store layout: 8-byte offset + text bytes, and nothing is resident until its pages are touched.
+def estimate_memory_per_million(sample_chunks, dim=768, compress=False):
+    if not sample_chunks:
+        raise ValueError("Need at least one sample chunk.")
+    n = len(sample_chunks)
+    scale = 1_000_000 / n
+
+    list_bytes = sum(sys.getsizeof(c) + 8 for c in sample_chunks) * scale
+    if compress:
+        text_bytes = sum(len(zlib.compress(c.encode("utf-8"))) for c in sample_chunks)
+    else:
+        text_bytes = sum(len(c.encode("utf-8")) for c in sample_chunks)
+    store_bytes = (text_bytes + 8 * n) * scale
+
+    return {
+        "python_list_text_bytes": int(list_bytes),
+        "chunk_store_text_bytes": int(store_bytes),
+        "embeddings_float32_bytes": 1_000_000 * dim * 4,
+        "embeddings_float16_bytes": 1_000_000 * dim * 2,
+        "embeddings_int8_bytes": 1_000_000 * (dim + 4),
+    }
+
+
+if __name__ == "__main__":
+    from RAG_Pipeline_Step3 import load_and_clean_text, chunk_text
+
+    file_path = "cleaned_data2.txt"
+    chunks = [c for c in chunk_text(load_and_clean_text(file_path)) if c.strip()]
+
+    print(f"Sample: {len(chunks)} chunks from {file_path}\n")
+    print("Estimated memory per 1M chunks (embedding-001, dim=768):")
+    plain = estimate_memory_per_million(chunks)
+    packed = estimate_memory_per_million(chunks, compress=True)
+    rows = [
+        ("list[str] text (resident)", plain["python_list_text_bytes"]),
+        ("chunk store text (mmap)", plain["chunk_store_text_bytes"]),
+        ("chunk store text (zlib, mmap)", packed["chunk_store_text_bytes"]),
+        ("embeddings float32", plain["embeddings_float32_bytes"]),
+        ("embeddings float16", plain["embeddings_float16_bytes"]),
+        ("embeddings int8", plain["embeddings_int8_bytes"]),
+    ]
+    for label, nbytes in rows:
+        print(f"  {label:<30} {nbytes / 2**20:9.1f} MiB")
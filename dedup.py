@@ -0,0 +1,144 @@
+import re
+import zlib
+import numpy as np
+from collections import defaultdict
+
+# === Near-Duplicate Chunk Elimination ===
+# Scraped pages repeat the same boilerplate (navigation blocks, nested divs whose text contains
+# each other's), and every copy costs an embedding call, index memory and a top-k slot.
+# dedup_chunks runs between chunk_text and get_google_embeddings and keeps one representative
+# per group of near-duplicate chunks:
+#   1. each chunk becomes a set of word 5-shingles
+#   2. a 128-value MinHash signature estimates Jaccard similarity between shingle sets
+#   3. LSH banding (16 bands x 8 rows) only pairs up chunks likely to be similar, so the
+#      corpus is never compared all-against-all
+#   4. a chunk is dropped only when every one of its shingles is already covered: either by a
+#      single longer kept chunk that contains it, or by the kept near-duplicates LSH paired it with.
+#      No text is ever removed from the index, only repeated copies of it; dedup_chunks checks that
+#      the kept chunks still cover every shingle of the input.
+
+MERSENNE_PRIME = (1 << 61) - 1
+MAX_HASH = (1 << 32) - 1
+
+
+def shingles(text, k=5):
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < k:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + k]) for i in range(len(words) - k + 1)}
+
+
+def _hash_shingles(shingle_set):
+    return np.array([zlib.crc32(s.encode("utf-8")) for s in shingle_set], dtype=np.uint64)
+
+
+# The minhash_signatures function returns one row of num_perm minimum hash values per shingle set,
+# using random linear permutations (a * x + b) mod p of the 32-bit shingle hashes.
+# a and b stay below 2**32 so a * x + b never overflows uint64.
+def minhash_signatures(shingle_sets, num_perm=128, seed=1):
+    rng = np.random.default_rng(seed)
+    a = rng.integers(1, MAX_HASH, size=num_perm, dtype=np.uint64)
+    b = rng.integers(0, MAX_HASH, size=num_perm, dtype=np.uint64)
+
+    signatures = np.full((len(shingle_sets), num_perm), MAX_HASH, dtype=np.uint64)
+    for row, shingle_set in enumerate(shingle_sets):
+        if not shingle_set:
+            continue
+        hashes = _hash_shingles(shingle_set)[:, None]
+        permuted = (a * hashes + b) % np.uint64(MERSENNE_PRIME)
+        signatures[row] = (permuted & np.uint64(MAX_HASH)).min(axis=0)
+    return signatures
+
+
+def lsh_candidate_pairs(signatures, bands=16):
+    num_perm = signatures.shape[1]
+    if num_perm % bands:
+        raise ValueError("num_perm must be divisible by the number of bands.")
+    rows = num_perm // bands
+
+    pairs = set()
+    for band in range(bands):
+        buckets = defaultdict(list)
+        for i, sig in enumerate(signatures[:, band * rows:(band + 1) * rows]):
+            buckets[sig.tobytes()].append(i)
+        for members in buckets.values():
+            for x in range(len(members)):
+                for y in range(x + 1, len(members)):
+                    pairs.add((members[x], members[y]))
+    return pairs
+
+
+# Returns (kept_chunks, report). Chunks are visited longest first, so boilerplate collapses into
+# the bigger chunk that contains it and exact copies collapse into the first one seen.
+# report["duplicate_of"] maps each dropped chunk's position to the kept chunk that covers most of it.
+def dedup_chunks(chunks, num_perm=128, bands=16, shingle_size=5):
+    shingle_sets = [shingles(chunk, shingle_size) for chunk in chunks]
+    signatures = minhash_signatures(shingle_sets, num_perm)
+
+    neighbours = defaultdict(list)
+    for i, j in lsh_candidate_pairs(signatures, bands):
+        neighbours[i].append(j)
+        neighbours[j].append(i)
+
+    kept_ids = set()
+    kept_by_shingle = defaultdict(set)
+    duplicate_of = {}
+    for i in sorted(range(len(chunks)), key=lambda i: (-len(chunks[i]), i)):
+        a = shingle_sets[i]
+        if a:
+            # a kept chunk containing all of a must contain any one shingle of a
+            probe = next(iter(a))
+            containers = [j for j in kept_by_shingle[probe] if a <= shingle_sets[j]]
+            if containers:
+                duplicate_of[i] = min(containers)
+                continue
+
+            near = [j for j in neighbours[i] if j in kept_ids]
+            if near and a <= set().union(*(shingle_sets[j] for j in near)):
+                duplicate_of[i] = max(near, key=lambda j: (len(a & shingle_sets[j]), -j))
+                continue
+
+        kept_ids.add(i)
+        for shingle in a:
+            kept_by_shingle[shingle].add(i)
+
+    all_shingles = set().union(*shingle_sets) if shingle_sets else set()
+    kept_shingles = set().union(*(shingle_sets[i] for i in kept_ids)) if kept_ids else set()
+    if kept_shingles != all_shingles:
+        raise RuntimeError("Deduplication would drop text from the index.")
+
+    kept = [chunk for i, chunk in enumerate(chunks) if i not in duplicate_of]
+    report = {
+        "chunks_before": len(chunks),
+        "chunks_after": len(kept),
+        "duplicates_removed": len(duplicate_of),
+        "duplicate_of": duplicate_of,
+    }
+    return kept, report
+
+
+def print_report(label, report, dim=768):
+    before, after = report["chunks_before"], report["chunks_after"]
+    print(f"{label}:")
+    print(f"  chunks:           {before} -> {after} ({report['duplicates_removed']} removed)")
+    print(f"  embedding calls:  {before} -> {after}")
+    print(f"  FAISS index size: {before * dim * 4 / 1024:.1f} KiB -> {after * dim * 4 / 1024:.1f} KiB")
+    if before:
+        print(f"  reduction:        {100 * (before - after) / before:.1f}%")
+
+
+if __name__ == "__main__":
+    from RAG_Pipeline_Step3 import load_and_clean_text, chunk_text
+
+    file_path = "cleaned_data2.txt"
+    text = load_and_clean_text(file_path)
+
+    # chunk_text carries up to 100 sentences into the next chunk, so most of its chunks overlap
+    # heavily and the reduction here is driven by that overlap rather than by scraped boilerplate
+    chunks = [c for c in chunk_text(text) if c.strip()]
+    print_report(f"chunk_text chunks of {file_path}", dedup_chunks(chunks)[1])
+
+    # One cleaned block per line with no overlap: only genuinely repeated text can be removed
+    blocks = [line.strip() for line in text.splitlines() if line.strip()]
+    print()
+    print_report(f"Non-overlapping blocks of {file_path}", dedup_chunks(blocks)[1])
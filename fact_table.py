@@ -0,0 +1,346 @@
+import os
+import re
+import json
+import time
+import argparse
+import threading
+
+# === Structured-Fact Fast Path ===
+# The scraper already extracts interest rates, loan amounts, tenure, fees and eligibility per
+# loan category. FactTable turns those fields into a (category, attribute) -> fact lookup table, and
+# a small keyword classifier maps questions such as "what is the max tenure of a personal loan?"
+# onto one (category, attribute) key. A match is answered straight from the table with its sources;
+# anything ambiguous or unknown returns None so the caller falls back to the full RAG pipeline.
+# A question only counts as a match when nothing is left after removing the category phrase, the
+# attribute phrase, an optional max/min qualifier and filler words: "interest subsidy on home loan",
+# "home loan tenure for NRI" or "penalty charges on late EMI" all keep a word the table cannot
+# account for, so they go to RAG. Max/min questions are answered by parsing the stored values.
+
+FACTS_FILE = "scraped_data_mahaloan2.json"
+
+ATTRIBUTE_LABELS = {
+    "interest_rates": "Interest rates",
+    "loan_amounts": "Loan amounts",
+    "tenure": "Tenure",
+    "fees_charges": "Fees & charges",
+    "age_requirements": "Age requirements",
+    "eligibility": "Eligibility criteria",
+}
+
+# Keyword patterns that identify which attribute a question is about
+ATTRIBUTE_PATTERNS = {
+    "interest_rates": r"\b(rate of interest|interest rates?|interest|roi|rates?)\b",
+    "loan_amounts": r"\b(loan amount|amount|how much|borrow|loan limit|quantum)\b",
+    "tenure": r"\b(tenure|repayment period|loan period|how long|duration)\b",
+    "fees_charges": r"\b(processing fees?|fees?|charges?)\b",
+    "age_requirements": r"\b(age limit|age|how old)\b",
+    "eligibility": r"\b(eligib\w*|who can apply|criteria)\b",
+}
+
+# Extra ways people name a category, on top of its own name ("home_loan" -> "home loan")
+CATEGORY_ALIASES = {
+    "home_loan": ["housing loan", "home loans"],
+    "personal_loan": ["personal loans"],
+    "gold_loan": ["loan against gold", "gold loans"],
+}
+
+QUALIFIER_PATTERNS = {
+    "max": r"\b(maximum|max|highest|longest|upper limit)\b",
+    "min": r"\b(minimum|min|lowest|shortest)\b",
+}
+
+# Words that carry no meaning of their own in a fact question
+FILLER_WORDS = {
+    "what", "whats", "who", "is", "are", "the", "a", "an", "of", "for", "on", "in", "to", "at", "with",
+    "i", "me", "my", "can", "get", "tell", "about", "please", "any", "there", "current", "currently",
+    "bank", "maharashtra", "mahabank", "loan", "loans",
+}
+
+# Attributes whose values can be parsed into numbers for max/min questions, with their singular label
+PARSEABLE_ATTRIBUTES = {"interest_rates": "interest rate", "loan_amounts": "loan amount", "tenure": "tenure"}
+
+# Questions that compare, explain or ask for a procedure need the LLM even when they name a fact
+FALLBACK_PATTERN = r"\b(compare|comparison|difference|versus|vs|better|why|explain|how (do|can|to)|prepay\w*|foreclos\w*)\b"
+
+
+def load_loan_schemes(path=FACTS_FILE):
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+class FactTable:
+    def __init__(self, facts):
+        self.facts = facts
+        self.lookups = 0
+        self.hits = 0
+        self._stats_lock = threading.Lock()
+
+        categories = {category for category, _ in facts}
+        self._category_patterns = [
+            (category, re.compile(r"\b(" + "|".join(
+                re.escape(alias) for alias in [category.replace("_", " ")] + CATEGORY_ALIASES.get(category, [])
+            ) + r")\b"))
+            for category in sorted(categories)
+        ]
+        self._attribute_patterns = [
+            (attribute, re.compile(pattern)) for attribute, pattern in ATTRIBUTE_PATTERNS.items()
+        ]
+        self._qualifier_patterns = [
+            (qualifier, re.compile(pattern)) for qualifier, pattern in QUALIFIER_PATTERNS.items()
+        ]
+        self._fallback_pattern = re.compile(FALLBACK_PATTERN)
+
+    # Builds the table from the scraper's loan_schemes (see BankOfMaharashtraLoanScraper.save_to_json).
+    # Schemes of the same category are merged and every scheme that contributed is kept as a source.
+    @classmethod
+    def from_loan_schemes(cls, loan_schemes):
+        facts = {}
+        for scheme in loan_schemes:
+            if "error" in scheme:
+                continue
+            basic = scheme.get("basic_info", {})
+            category = basic.get("category")
+            if not category:
+                continue
+            source = {"name": basic.get("name", category), "url": basic.get("url", "")}
+
+            fields = dict(scheme.get("financial_details", {}))
+            eligibility = scheme.get("eligibility_criteria", {})
+            fields["age_requirements"] = eligibility.get("age_requirements", [])
+            fields["eligibility"] = eligibility.get("criteria_list", [])
+
+            for attribute, values in fields.items():
+                values = [v.strip() for v in values if v and v.strip()]
+                if attribute not in ATTRIBUTE_LABELS or not values:
+                    continue
+                fact = facts.setdefault((category, attribute), {"values": [], "sources": []})
+                fact["values"].extend(v for v in values if v not in fact["values"])
+                if source not in fact["sources"]:
+                    fact["sources"].append(source)
+        return cls(facts)
+
+    @classmethod
+    def load(cls, path=FACTS_FILE):
+        return cls.from_loan_schemes(load_loan_schemes(path))
+
+    # Returns (category, attribute, qualifier) when the question names exactly one category and one
+    # attribute, at most one max/min qualifier, and nothing else; otherwise None
+    def classify(self, question):
+        text = question.lower()
+        if self._fallback_pattern.search(text):
+            return None
+
+        categories = [category for category, pattern in self._category_patterns if pattern.search(text)]
+        attributes = [attribute for attribute, pattern in self._attribute_patterns if pattern.search(text)]
+        qualifiers = [qualifier for qualifier, pattern in self._qualifier_patterns if pattern.search(text)]
+        if len(categories) != 1 or len(attributes) != 1 or len(qualifiers) > 1:
+            return None
+
+        residual = text
+        for _, pattern in self._category_patterns + self._attribute_patterns + self._qualifier_patterns:
+            residual = pattern.sub(" ", residual)
+        if any(word not in FILLER_WORDS for word in re.findall(r"[a-z0-9]+", residual)):
+            return None
+
+        return categories[0], attributes[0], qualifiers[0] if qualifiers else None
+
+    # Returns the fast-path answer, or None when the question should go to RAG.
+    # Every call is counted, so hit_rate() reflects the questions actually asked.
+    def answer(self, question):
+        answer = self._answer(question)
+        with self._stats_lock:
+            self.lookups += 1
+            if answer is not None:
+                self.hits += 1
+        return answer
+
+    def _answer(self, question):
+        key = self.classify(question)
+        if key is None:
+            return None
+        category, attribute, qualifier = key
+        fact = self.facts.get((category, attribute))
+        if fact is None:
+            return None
+
+        label = ATTRIBUTE_LABELS[attribute]
+        if qualifier is None:
+            value = ", ".join(fact["values"])
+        else:
+            value = extreme_value(attribute, fact["values"], qualifier)
+            if value is None:
+                return None
+            label = f"{'Maximum' if qualifier == 'max' else 'Minimum'} {PARSEABLE_ATTRIBUTES[attribute]}"
+
+        sources = "; ".join(f"{s['name']} ({s['url']})" if s["url"] else s["name"] for s in fact["sources"])
+        return f"{label} for {category.replace('_', ' ').title()}: {value}.\n\nSource: {sources}"
+
+    def hit_rate(self):
+        return self.hits / self.lookups if self.lookups else 0.0
+
+    def stats(self):
+        with self._stats_lock:
+            return {"lookups": self.lookups, "hits": self.hits}
+
+
+# === Max/Min Values ===
+# parse_quantities turns one extracted value into numbers in a common unit
+# (months for tenure, rupees for amounts, percent for rates); ranges such as "2-7 years" give both ends.
+# A number only counts when it carries its unit (Rs./₹/lakh/crore, year/month, %). A value with any
+# number that does not, or one that is a different kind of quantity ("Rs. 5000 per gram", "75% of
+# value", "up to 60 years of age"), parses to nothing, and extreme_value then refuses to answer.
+AMOUNT_UNITS = {"lakh": 100_000, "crore": 10_000_000}
+
+NUMBER = r"\d+(?:,\d+)*(?:\.\d+)?"
+
+QUANTITY_PATTERNS = {
+    "loan_amounts": r"(?:(?:\brs\.?|\binr|₹)\s*)(" + NUMBER + r")(?:\s*(lakh|crore)s?\b)?|(" + NUMBER
+                    + r")\s*(lakh|crore)s?\b",
+    "tenure": r"(" + NUMBER + r")(?:\s*(?:-|to)\s*(" + NUMBER + r"))?\s*(year|month)s?\b",
+    "interest_rates": r"(" + NUMBER + r")\s*(?:%|percent)",
+}
+
+# Values that hold a correctly-unitted number that is still not the quantity asked about
+REJECT_PATTERNS = {
+    "loan_amounts": r"%|\bper\s*(?:gram|gm|g)\b|\bpercent|\bof (?:the )?value\b",
+    "tenure": r"\b(?:age|aged|old|retire\w*)\b",
+}
+
+# No loan tenure runs past 30 years; a longer one is an age limit the scraper's regexes picked up
+MAX_TENURE_MONTHS = 30 * 12
+
+
+def parse_quantities(attribute, value):
+    text = value.lower()
+    pattern = QUANTITY_PATTERNS.get(attribute)
+    if pattern is None:
+        return []
+    reject = REJECT_PATTERNS.get(attribute)
+    if reject and re.search(reject, text):
+        return []
+
+    quantities = []
+    matched_numbers = 0
+    for match in re.finditer(pattern, text):
+        if attribute == "loan_amounts":
+            number = match.group(1) or match.group(3)
+            unit = match.group(2) or match.group(4)
+            quantities.append(float(number.replace(",", "")) * AMOUNT_UNITS.get(unit, 1))
+            matched_numbers += 1
+        elif attribute == "tenure":
+            factor = 12 if match.group(3) == "year" else 1
+            ends = [n for n in match.group(1, 2) if n]
+            quantities.extend(float(n.replace(",", "")) * factor for n in ends)
+            matched_numbers += len(ends)
+        else:
+            quantities.append(float(match.group(1).replace(",", "")))
+            matched_numbers += 1
+
+    # every number in the value must belong to a quantity; "Rs. 10,000 to 5,00,000" is ambiguous
+    if matched_numbers != len(re.findall(NUMBER, text)):
+        return []
+    return quantities
+
+
+def format_quantity(attribute, quantity):
+    if attribute == "tenure":
+        if quantity % 12 == 0:
+            years = quantity / 12
+            return f"{years:g} year{'' if years == 1 else 's'}"
+        return f"{quantity:g} month{'' if quantity == 1 else 's'}"
+    if attribute == "loan_amounts":
+        for unit, factor in sorted(AMOUNT_UNITS.items(), key=lambda item: -item[1]):
+            if quantity >= factor:
+                return f"Rs. {quantity / factor:g} {unit}"
+        return f"Rs. {quantity:,.0f}"
+    return f"{quantity:g}%"
+
+
+# Returns the largest (qualifier="max") or smallest (qualifier="min") value, or None when the
+# values cannot all be compared; a single unreadable value means the extreme could be wrong,
+# so the question goes to RAG instead of being answered from the table
+def extreme_value(attribute, values, qualifier):
+    if attribute not in PARSEABLE_ATTRIBUTES:
+        return None
+    quantities = []
+    for value in values:
+        parsed = parse_quantities(attribute, value)
+        if not parsed:
+            return None
+        quantities.extend(parsed)
+    if attribute == "tenure" and max(quantities) > MAX_TENURE_MONTHS:
+        return None
+    pick = max if qualifier == "max" else min
+    return format_quantity(attribute, pick(quantities))
+
+
+# Loads the fact table next to the scraped data if it exists, so the apps can run without it
+def load_fact_table(path=FACTS_FILE):
+    if not os.path.exists(path):
+        return None
+    return FactTable.load(path)
+
+
+# Hand-picked questions that show which phrasings take the fast path and which go to RAG.
+# The hit rate is measured on load_test.QUESTION_MIX instead, which weights questions like real traffic.
+SAMPLE_QUESTIONS = [
+    "What is the maximum tenure of a personal loan?",
+    "What is the interest rate for a home loan?",
+    "Gold loan interest rate?",
+    "How much can I borrow with a personal loan?",
+    "What is the processing fee for a housing loan?",
+    "What is the age limit for a home loan?",
+    "Who is eligible for a gold loan?",
+    "What documents are required for a personal loan?",
+    "Compare home loan and personal loan interest rates",
+    "How do I apply for a gold loan?",
+    "Can I prepay my home loan without charges?",
+    "What is the EMI for 20 lakh over 15 years?",
+    "Is there any interest subsidy on home loan?",
+    "Penalty charges on late EMI for personal loan",
+    "Interest rate on personal loan for women",
+    "Home loan tenure for NRI",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Report the fact-table fast-path hit rate and lookup time.")
+    parser.add_argument("--facts", default=FACTS_FILE, help="JSON exported by Scraping_Step.py")
+    args = parser.parse_args()
+
+    table = load_fact_table(args.facts)
+    if table is None:
+        print(f"❌ {args.facts} not found. Run Scraping_Step.py first to export the structured data.")
+        return
+
+    from load_test import QUESTION_MIX
+
+    print(f"Fact table: {len(table.facts)} (category, attribute) entries\n")
+    print("Sample questions:")
+    for question in SAMPLE_QUESTIONS:
+        print(f"  {'FAST' if table.answer(question) else 'RAG ':<4}  {question}")
+
+    # Weighted hit rate over the load-test question mix, each question counted as often as its weight
+    table = FactTable(table.facts)
+    print("\nLoad-test question mix (weight):")
+    for question, weight in QUESTION_MIX:
+        answer = None
+        for _ in range(weight):
+            answer = table.answer(question)
+        print(f"  {'FAST' if answer else 'RAG ':<4}  ({weight})  {question}")
+    hit_rate = table.hit_rate()
+
+    questions = [question for question, _ in QUESTION_MIX]
+    rounds = 10000
+    start = time.perf_counter()
+    for _ in range(rounds):
+        for question in questions:
+            table.answer(question)
+    per_question_us = (time.perf_counter() - start) / (rounds * len(questions)) * 1e6
+
+    print(f"\nFast-path hit rate on the question mix: {hit_rate:.0%}")
+    print(f"Average time per question (hit or miss): {per_question_us:.1f} µs")
+
+
+if __name__ == "__main__":
+    main()
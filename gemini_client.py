@@ -0,0 +1,304 @@
+import os
+import time
+import random
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import numpy as np
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+# === Shared Gemini Client ===
+# One client per API key is created on first use and reused by every call, so genai.configure and
+# GenerativeModel construction happen once instead of on every embedding or answer.
+# Every call goes through a ResilientCaller, which adds:
+#   - a per-call deadline covering every attempt, hedge and backoff sleep of that call
+#     (what is left of it is passed down as the request timeout)
+#   - jittered exponential backoff when the API throttles (HTTP 429) or has a transient failure
+#   - a hedged duplicate request when the first one is slower than the recent p95 latency
+#     (embeddings only by default: a duplicate generation doubles the LLM cost of that answer)
+#   - a circuit breaker that fails fast after repeated failed calls instead of queueing more calls
+
+EMBEDDING_MODEL = "models/embedding-001"
+LLM_MODEL = "gemini-1.5-flash"
+
+
+class ThrottledError(RuntimeError):
+    pass
+
+
+class TransientError(RuntimeError):
+    pass
+
+
+class CallDeadlineExceeded(TimeoutError):
+    pass
+
+
+class CircuitOpenError(RuntimeError):
+    pass
+
+
+THROTTLE_ERRORS = (ThrottledError, google_exceptions.ResourceExhausted, google_exceptions.TooManyRequests)
+RETRYABLE_ERRORS = THROTTLE_ERRORS + (
+    TransientError,
+    CallDeadlineExceeded,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+)
+
+
+# Keeps the latencies of the most recent successful requests to decide when to hedge
+class LatencyTracker:
+    def __init__(self, window=1000):
+        self.samples = deque(maxlen=window)
+        self.lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.samples)
+
+    def record(self, seconds):
+        with self.lock:
+            self.samples.append(seconds)
+
+    def percentile(self, p):
+        with self.lock:
+            if not self.samples:
+                return None
+            return float(np.percentile(self.samples, p))
+
+
+# closed -> open after failure_threshold consecutive failed calls; after reset_timeout seconds
+# exactly one probe call is let through (half-open) while every other caller is still rejected,
+# and the probe's outcome closes or re-opens the circuit.
+class CircuitBreaker:
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.probe_in_flight = False
+        self.lock = threading.Lock()
+
+    def allow(self):
+        with self.lock:
+            if self.state == "open":
+                if time.monotonic() - self.opened_at < self.reset_timeout:
+                    return False
+                self.state = "half_open"
+                self.probe_in_flight = False
+            if self.state == "half_open":
+                if self.probe_in_flight:
+                    return False
+                self.probe_in_flight = True
+            return True
+
+    def record_success(self):
+        with self.lock:
+            self.failures = 0
+            self.state = "closed"
+            self.probe_in_flight = False
+
+    def record_failure(self):
+        with self.lock:
+            self.failures += 1
+            self.probe_in_flight = False
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+    # Ends a call that says nothing about the backend's health (e.g. a bad request),
+    # so a half-open breaker can send its next probe
+    def release(self):
+        with self.lock:
+            self.probe_in_flight = False
+
+
+class ResilientCaller:
+    def __init__(self, deadline=30.0, max_retries=4, base_delay=0.5, max_delay=8.0, hedge=True,
+                 hedge_percentile=95, hedge_min_samples=20, breaker=None, max_workers=32):
+        self.deadline = deadline
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.hedge = hedge
+        self.hedge_percentile = hedge_percentile
+        self.hedge_min_samples = hedge_min_samples
+        self.breaker = breaker or CircuitBreaker()
+        self.latency = LatencyTracker()
+        self.stats = {"calls": 0, "retries": 0, "hedges": 0, "hedge_wins": 0, "rejected": 0}
+        self._stats_lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=max_workers)
+
+    # fn is called as fn(*args, timeout=<seconds left>, **kwargs) and must be safe to run twice.
+    # The breaker sees one outcome per call: retries inside the call (e.g. on throttling) do not
+    # count as separate failures, only a call that runs out of retries or deadline does.
+    def call(self, fn, *args, **kwargs):
+        self._count("calls")
+        if not self.breaker.allow():
+            self._count("rejected")
+            raise CircuitOpenError("Gemini circuit breaker is open; failing fast.")
+
+        deadline_at = time.monotonic() + self.deadline
+        try:
+            result = self._call_with_retries(fn, args, kwargs, deadline_at)
+        except RETRYABLE_ERRORS:
+            self.breaker.record_failure()
+            raise
+        except BaseException:
+            self.breaker.release()
+            raise
+        self.breaker.record_success()
+        return result
+
+    # Retries with full-jitter exponential backoff, but never sleeps past the call's deadline
+    def _call_with_retries(self, fn, args, kwargs, deadline_at):
+        for attempt in range(self.max_retries + 1):
+            try:
+                return self._attempt(fn, args, kwargs, deadline_at)
+            except RETRYABLE_ERRORS:
+                delay = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+                if attempt == self.max_retries or time.monotonic() + delay >= deadline_at:
+                    raise
+                self._count("retries")
+                time.sleep(delay)
+
+    def _count(self, key):
+        with self._stats_lock:
+            self.stats[key] += 1
+
+    def _hedge_delay(self):
+        if not self.hedge or len(self.latency) < self.hedge_min_samples:
+            return None
+        return self.latency.percentile(self.hedge_percentile)
+
+    def _timed(self, fn, args, kwargs, timeout):
+        start = time.monotonic()
+        result = fn(*args, timeout=timeout, **kwargs)
+        self.latency.record(time.monotonic() - start)
+        return result
+
+    # One attempt: the first request, plus a hedge if it is still running after the hedge delay.
+    # Whichever succeeds first wins; the loser is left to finish in the background.
+    def _attempt(self, fn, args, kwargs, deadline_at):
+        start = time.monotonic()
+        if start >= deadline_at:
+            raise CallDeadlineExceeded(f"No response within {self.deadline:.1f}s.")
+        hedge_delay = self._hedge_delay()
+        primary = self._pool.submit(self._timed, fn, args, kwargs, deadline_at - start)
+        pending = {primary}
+        hedged = False
+        error = None
+
+        while pending:
+            now = time.monotonic()
+            if now >= deadline_at:
+                break
+            wait_for = deadline_at - now
+            if hedge_delay is not None and not hedged:
+                wait_for = min(wait_for, max(0.0, start + hedge_delay - now))
+
+            done, pending = wait(pending, timeout=wait_for, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is None:
+                    if future is not primary:
+                        self._count("hedge_wins")
+                    return future.result()
+                error = future.exception()
+
+            if not pending and not hedged and error is not None:
+                raise error
+            if not hedged and hedge_delay is not None and time.monotonic() - start >= hedge_delay:
+                hedged = True
+                self._count("hedges")
+                pending.add(self._pool.submit(self._timed, fn, args, kwargs, deadline_at - time.monotonic()))
+
+        if error is not None and not pending:
+            raise error
+        raise CallDeadlineExceeded(f"No response within {self.deadline:.1f}s.")
+
+
+# Embeddings (~20 ms) and generations (~300 ms and up) get separate callers, so each one hedges
+# against its own latency history; with a shared history the p95 would be an embedding latency and
+# nearly every generation would be duplicated. Both callers share one circuit breaker, since they
+# fail together when the API is down.
+def make_callers(embed_caller=None, generate_caller=None):
+    if embed_caller is None:
+        embed_caller = ResilientCaller(breaker=generate_caller.breaker if generate_caller else None)
+    if generate_caller is None:
+        generate_caller = ResilientCaller(hedge=False, breaker=embed_caller.breaker)
+    return embed_caller, generate_caller
+
+
+class GeminiClient:
+    def __init__(self, api_key, embedding_model=EMBEDDING_MODEL, llm_model=LLM_MODEL, embed_caller=None,
+                 generate_caller=None):
+        genai.configure(api_key=api_key)
+        self.embedding_model = embedding_model
+        self.model = genai.GenerativeModel(llm_model)
+        self.embed_caller, self.generate_caller = make_callers(embed_caller, generate_caller)
+
+    def embed(self, content, task_type="retrieval_document"):
+        return self.embed_caller.call(self._embed, content, task_type)
+
+    def generate(self, prompt):
+        return self.generate_caller.call(self._generate, prompt)
+
+    def _embed(self, content, task_type, timeout=None):
+        response = genai.embed_content(
+            model=self.embedding_model,
+            content=content,
+            task_type=task_type,
+            request_options={"timeout": timeout},
+        )
+        return response["embedding"]
+
+    def _generate(self, prompt, timeout=None):
+        response = self.model.generate_content(prompt, request_options={"timeout": timeout})
+        return response.text.strip()
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+# A forked child (e.g. a ProcessPoolExecutor worker in ShardedCorpus.add_documents) inherits the
+# parent's clients, but not the threads of their ResilientCaller pools, so every call would wait out
+# its deadline. The child starts with no clients instead and creates its own on first use.
+def _reset_clients_after_fork():
+    global _clients_lock
+    _clients_lock = threading.Lock()
+    _clients.clear()
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_clients_after_fork)
+
+
+# get_client returns the shared client for an API key, creating it on first use
+def get_client(api_key):
+    with _clients_lock:
+        if api_key not in _clients:
+            _clients[api_key] = GeminiClient(api_key)
+        return _clients[api_key]
+
+
+# register_client installs a ready-made client (e.g. stub_server.StubGeminiClient) under an API key,
+# so the unchanged pipeline functions can be pointed at a local backend
+def register_client(api_key, client):
+    with _clients_lock:
+        _clients[api_key] = client
+
+
+if __name__ == "__main__":
+    from stub_server import benchmark_hedging
+
+    print("Embedding latency against fault-injecting stub (3% slow at 500 ms, 1% throttled, 1% errors):")
+    for label, row in benchmark_hedging().items():
+        print(
+            f"  {label:<9} p50 {row['p50_ms']:7.1f} ms  p95 {row['p95_ms']:7.1f} ms  p99 {row['p99_ms']:7.1f} ms"
+            f"  retries {row['retries']:3d}  hedges {row['hedges']:3d}  hedge wins {row['hedge_wins']:3d}"
+        )
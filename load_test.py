@@ -0,0 +1,197 @@
+import os
+import time
+import random
+import argparse
+import threading
+
+import numpy as np
+import psutil
+
+from gemini_client import ResilientCaller, register_client
+from RAG_Pipeline_Step3 import rag_pipeline, load_and_clean_text, chunk_text, get_google_embeddings
+from dedup import dedup_chunks
+from fact_table import FACTS_FILE, load_fact_table
+from sharded_index import ShardedCorpus, corpus_rag_pipeline, shard_name_for
+from stub_server import StubConfig, StubProcess, StubGeminiClient
+
+# === Concurrent-User Load Test ===
+# Simulates N users hitting the pipeline at the same time, each one asking a question, reading the
+# answer for a random think time, and asking again. Embeddings and answers come from the local stub
+# server with configurable latency, so capacity can be checked offline and without API costs.
+# The stub runs in its own process and only this (harness) process is monitored, so the CPU and
+# memory figures are the pipeline's alone.
+#
+# Two entry points can be exercised:
+#   ingest  -> rag_pipeline: every question re-reads, chunks, embeds and indexes the document
+#              (the same per-question work app.py does for its uploads)
+#   indexed -> corpus_rag_pipeline: questions are answered from a corpus indexed once up front
+#
+# Only these pipeline functions are measured, not app.py itself: the Streamlit script runs its UI at
+# import and keeps its own copies of the embed/ask helpers, so the app's request path (file upload,
+# script reruns, its per-request ShardedCorpus) and Streamlit's own overhead are not part of the numbers.
+#
+# When the scraper's fact table is available, both entry points use its fast path and the report
+# includes the share of questions it answered without retrieval or an LLM call.
+#
+# The report has throughput, latency percentiles, and CPU / memory sampled over the run.
+
+STUB_API_KEY = "load-test-stub"
+
+# (question, weight): the mix is drawn in proportion to the weights
+QUESTION_MIX = [
+    ("What is the interest rate for a home loan?", 5),
+    ("What is the maximum tenure of a personal loan?", 4),
+    ("How much gold loan can I get per gram of gold?", 3),
+    ("What documents are required for a personal loan?", 3),
+    ("What is the processing fee for a home loan?", 2),
+    ("Who is eligible for the Maha Super Housing Loan Scheme?", 2),
+    ("Can I prepay my home loan without charges?", 1),
+]
+
+
+class ResourceMonitor:
+    def __init__(self, interval=1.0):
+        self.interval = interval
+        self.samples = []
+        self.process = psutil.Process(os.getpid())
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+
+    def _run(self):
+        start = time.perf_counter()
+        self.process.cpu_percent(None)
+        while not self._stop.wait(self.interval):
+            self.samples.append({
+                "t": time.perf_counter() - start,
+                "cpu_percent": self.process.cpu_percent(None),
+                "rss_mb": self.process.memory_info().rss / 2**20,
+            })
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+
+# One simulated user: ask, wait for the answer, think (exponentially distributed), repeat
+def _user_session(user_id, ask, duration, think_time, results, lock):
+    rng = random.Random(user_id)
+    questions, weights = zip(*QUESTION_MIX)
+    end_at = time.perf_counter() + duration
+
+    while time.perf_counter() < end_at:
+        question = rng.choices(questions, weights)[0]
+        start = time.perf_counter()
+        try:
+            ask(question)
+            ok = True
+        except Exception:
+            ok = False
+        with lock:
+            results.append((start, time.perf_counter() - start, ok))
+        time.sleep(rng.expovariate(1 / think_time) if think_time > 0 else 0)
+
+
+def run_load_test(ask, users=10, duration=30.0, think_time=2.0, sample_interval=1.0, fact_table=None):
+    results = []
+    lock = threading.Lock()
+    monitor = ResourceMonitor(sample_interval)
+    threads = [
+        threading.Thread(target=_user_session, args=(i, ask, duration, think_time, results, lock))
+        for i in range(users)
+    ]
+
+    facts_before = fact_table.stats() if fact_table else None
+    monitor.start()
+    start = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - start
+    monitor.stop()
+
+    latencies = [latency for _, latency, ok in results if ok]
+    report = {
+        "users": users,
+        "elapsed_s": elapsed,
+        "requests": len(results),
+        "errors": sum(1 for _, _, ok in results if not ok),
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0.0,
+        "resources": monitor.samples,
+        "fast_path_hit_rate": None,
+    }
+    if fact_table:
+        facts_after = fact_table.stats()
+        lookups = facts_after["lookups"] - facts_before["lookups"]
+        if lookups:
+            report["fast_path_hit_rate"] = (facts_after["hits"] - facts_before["hits"]) / lookups
+    for p in (50, 90, 95, 99):
+        report[f"p{p}_ms"] = float(np.percentile(latencies, p) * 1000) if latencies else float("nan")
+    return report
+
+
+def print_report(label, report):
+    print(f"\n[{label}] {report['users']} users, {report['elapsed_s']:.1f}s")
+    print(f"  requests {report['requests']}  errors {report['errors']}  "
+          f"throughput {report['throughput_rps']:.2f} req/s")
+    print(f"  latency p50 {report['p50_ms']:.0f} ms  p90 {report['p90_ms']:.0f} ms  "
+          f"p95 {report['p95_ms']:.0f} ms  p99 {report['p99_ms']:.0f} ms")
+    if report["fast_path_hit_rate"] is not None:
+        print(f"  fact-table fast path answered {report['fast_path_hit_rate']:.0%} of questions")
+    print(f"  {'t (s)':>6} {'CPU %':>7} {'RSS MB':>8}")
+    for sample in report["resources"]:
+        print(f"  {sample['t']:>6.1f} {sample['cpu_percent']:>7.1f} {sample['rss_mb']:>8.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load-test the RAG pipeline with concurrent simulated users.")
+    parser.add_argument("--file", default="cleaned_data2.txt", help="document the users ask about")
+    parser.add_argument("--mode", choices=["ingest", "indexed", "both"], default="both")
+    parser.add_argument("--users", type=int, nargs="+", default=[1, 5, 10, 20])
+    parser.add_argument("--duration", type=float, default=20.0, help="seconds per run")
+    parser.add_argument("--think-time", type=float, default=2.0, help="mean seconds between questions")
+    parser.add_argument("--embed-latency-ms", type=float, default=30.0)
+    parser.add_argument("--generate-latency-ms", type=float, default=400.0)
+    parser.add_argument("--slow-prob", type=float, default=0.0, help="fraction of stub calls that are slow")
+    parser.add_argument("--sample-interval", type=float, default=1.0)
+    parser.add_argument("--facts", default=FACTS_FILE, help="scraper JSON for the fact-table fast path, if present")
+    args = parser.parse_args()
+
+    fact_table = load_fact_table(args.facts)
+    if fact_table is None:
+        print(f"{args.facts} not found; running without the fact-table fast path.")
+
+    config = StubConfig(embed_latency_ms=args.embed_latency_ms, generate_latency_ms=args.generate_latency_ms,
+                        slow_prob=args.slow_prob, seed=0)
+    with StubProcess(config) as server:
+        register_client(STUB_API_KEY, StubGeminiClient(server.url, embed_caller=ResilientCaller(max_workers=64)))
+        modes = ["ingest", "indexed"] if args.mode == "both" else [args.mode]
+
+        for mode in modes:
+            corpus = None
+            if mode == "ingest":
+                def ask(question):
+                    return rag_pipeline(question, args.file, STUB_API_KEY, fact_table)
+            else:
+                chunks, _ = dedup_chunks([c for c in chunk_text(load_and_clean_text(args.file)) if c.strip()])
+                corpus = ShardedCorpus()
+                corpus.add_shard(shard_name_for(args.file), chunks, get_google_embeddings(chunks, STUB_API_KEY))
+
+                def ask(question):
+                    return corpus_rag_pipeline(question, corpus, STUB_API_KEY, fact_table)
+
+            try:
+                for users in args.users:
+                    report = run_load_test(ask, users, args.duration, args.think_time, args.sample_interval,
+                                           fact_table)
+                    print_report(f"{mode}", report)
+            finally:
+                if corpus is not None:
+                    corpus.close()
+
+
+if __name__ == "__main__":
+    main()
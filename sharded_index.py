@@ -0,0 +1,256 @@
+import os
+import re
+import time
+import heapq
+import shutil
+import tempfile
+import faiss
+import numpy as np
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from chunk_store import ChunkStore, build_chunk_store
+from dedup import dedup_chunks
+from RAG_Pipeline_Step3 import (
+    load_and_clean_text,
+    chunk_text,
+    get_google_embeddings,
+    build_faiss_index,
+    embed_query,
+    ask_gemini,
+)
+
+# === Sharded Corpus Index ===
+# Instead of one index for one file, the corpus keeps one shard per document (a loan scheme page,
+# a circular, a rate sheet...). Each shard is its own FAISS index plus its own chunk store, saved in
+# corpus_dir/<shard name>/. Adding or removing a document only writes or deletes that one directory.
+# A query is sent to every shard in parallel and the per-shard hits are merged into a global top-k.
+# A corpus without a corpus_dir (e.g. the uploads in the Streamlit app) writes its shards to a scratch
+# directory that close() deletes, so its chunks are still read from a chunk store, not a Python list.
+
+INDEX_FILE = "index.faiss"
+
+
+# Shard names come from the document file name, e.g. "Home Loan Rates.txt" -> "home_loan_rates"
+def shard_name_for(file_path):
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    return re.sub(r"[^a-z0-9]+", "_", stem.lower()).strip("_") or "document"
+
+
+# Like shard_name_for, but appends _2, _3, ... when the name is already taken,
+# so two uploads called e.g. "rates.txt" and "Rates.txt" do not replace each other
+def unique_shard_name(file_path, taken):
+    base = name = shard_name_for(file_path)
+    suffix = 2
+    while name in taken:
+        name = f"{base}_{suffix}"
+        suffix += 1
+    return name
+
+
+# The _build_shard function runs in a worker process: it cleans, chunks and embeds one document
+# and writes the shard to a temporary directory that is swapped into place once complete,
+# so a half-written shard is never picked up by load().
+def _build_shard(file_path, shard_dir, api_key):
+    text = load_and_clean_text(file_path)
+    chunks = [c for c in chunk_text(text) if c.strip()]
+    if not chunks:
+        raise ValueError(f"No valid text chunks found in {file_path}.")
+
+    chunks, _ = dedup_chunks(chunks)
+    embeddings = get_google_embeddings(chunks, api_key)
+    _write_shard(shard_dir, chunks, embeddings)
+    return shard_dir
+
+
+def _write_shard(shard_dir, chunks, embeddings):
+    tmp_dir = shard_dir + ".tmp"
+    if os.path.exists(tmp_dir):
+        shutil.rmtree(tmp_dir)
+
+    build_chunk_store(chunks, tmp_dir)
+    faiss.write_index(build_faiss_index(embeddings), os.path.join(tmp_dir, INDEX_FILE))
+
+    if os.path.exists(shard_dir):
+        shutil.rmtree(shard_dir)
+    os.replace(tmp_dir, shard_dir)
+
+
+class Shard:
+    def __init__(self, name, index, chunks):
+        self.name = name
+        self.index = index
+        self.chunks = chunks
+
+    @classmethod
+    def load(cls, shard_dir):
+        index = faiss.read_index(os.path.join(shard_dir, INDEX_FILE))
+        return cls(os.path.basename(shard_dir), index, ChunkStore(shard_dir))
+
+    # Returns (distance, shard name, chunk text) tuples so hits from different shards can be merged
+    def search(self, query_embedding, top_k):
+        distances, indices = self.index.search(query_embedding, min(top_k, self.index.ntotal))
+        return [
+            (float(d), self.name, self.chunks[i])
+            for d, i in zip(distances[0], indices[0])
+            if 0 <= i < len(self.chunks)
+        ]
+
+
+class ShardedCorpus:
+    def __init__(self, corpus_dir=None, max_workers=None):
+        self.corpus_dir = corpus_dir
+        self.shards = {}
+        self._scratch_dir = None
+        self.max_workers = max_workers or os.cpu_count()
+        self._search_pool = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    # Opens every shard directory found under corpus_dir
+    @classmethod
+    def load(cls, corpus_dir, max_workers=None):
+        corpus = cls(corpus_dir, max_workers)
+        for name in sorted(os.listdir(corpus_dir)):
+            shard_dir = os.path.join(corpus_dir, name)
+            if os.path.isfile(os.path.join(shard_dir, INDEX_FILE)):
+                corpus.shards[name] = Shard.load(shard_dir)
+        return corpus
+
+    def __len__(self):
+        return len(self.shards)
+
+    # Directory the shards are written to: corpus_dir, or a scratch directory created on first use
+    def _shard_root(self):
+        if self.corpus_dir:
+            return self.corpus_dir
+        if self._scratch_dir is None:
+            self._scratch_dir = tempfile.mkdtemp(prefix="rag_corpus_")
+        return self._scratch_dir
+
+    # Adds a shard from chunks that were already embedded (e.g. uploaded in the Streamlit app).
+    # When the corpus is backed by a directory the shard is persisted there as well.
+    def add_shard(self, name, chunks, embeddings):
+        if len(chunks) != embeddings.shape[0]:
+            raise ValueError("Each chunk needs exactly one embedding.")
+        shard_dir = os.path.join(self._shard_root(), name)
+        _write_shard(shard_dir, chunks, embeddings)
+        self.shards[name] = Shard.load(shard_dir)
+
+    # Builds (or rebuilds) one shard per file. Documents are processed in parallel worker processes;
+    # shards for files not in file_paths are left untouched.
+    def add_documents(self, file_paths, api_key):
+        if not self.corpus_dir:
+            raise ValueError("add_documents needs a corpus_dir to write shards to.")
+        os.makedirs(self.corpus_dir, exist_ok=True)
+
+        jobs = {shard_name_for(path): path for path in file_paths}
+        if len(jobs) != len(file_paths):
+            raise ValueError("Two documents map to the same shard name.")
+
+        with ProcessPoolExecutor(max_workers=min(self.max_workers, len(jobs) or 1)) as pool:
+            futures = {
+                name: pool.submit(_build_shard, path, os.path.join(self.corpus_dir, name), api_key)
+                for name, path in jobs.items()
+            }
+            for name, future in futures.items():
+                self.shards[name] = Shard.load(future.result())
+
+    def add_document(self, file_path, api_key):
+        self.add_documents([file_path], api_key)
+
+    def remove_document(self, name):
+        if name not in self.shards:
+            raise KeyError(f"No shard named '{name}'.")
+        del self.shards[name]
+        root = self.corpus_dir or self._scratch_dir
+        if root:
+            shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+    # Fans the query out to all shards in parallel (FAISS releases the GIL while searching)
+    # and keeps the top_k smallest L2 distances across every shard.
+    def search(self, query_embedding, top_k=5):
+        shards = list(self.shards.values())
+        if not shards:
+            return []
+        if len(shards) == 1:
+            return shards[0].search(query_embedding, top_k)
+
+        per_shard = self._search_pool.map(lambda shard: shard.search(query_embedding, top_k), shards)
+        hits = [hit for shard_hits in per_shard for hit in shard_hits]
+        return heapq.nsmallest(top_k, hits, key=lambda hit: hit[0])
+
+    # Same contract as retrieve_chunks: a list of the most relevant chunk texts
+    def retrieve_chunks(self, query_embedding, top_k=5):
+        return [chunk for _, _, chunk in self.search(query_embedding, top_k)]
+
+    def close(self):
+        self._search_pool.shutdown(wait=True)
+        if self._scratch_dir is not None:
+            self.shards = {}
+            shutil.rmtree(self._scratch_dir, ignore_errors=True)
+            self._scratch_dir = None
+
+
+# ===  RAG Pipeline over a Sharded Corpus ===
+def corpus_rag_pipeline(question, corpus, api_key, fact_table=None):
+    if fact_table is not None:
+        answer = fact_table.answer(question)
+        if answer:
+            return answer
+
+    if not len(corpus):
+        raise ValueError("The corpus has no indexed documents.")
+
+    query_embedding = embed_query(question, api_key)
+    relevant_chunks = corpus.retrieve_chunks(query_embedding)
+
+    if not relevant_chunks:
+        return "Sorry, I couldn’t find anything relevant in the documents."
+
+    return ask_gemini(question, relevant_chunks, api_key)
+
+
+# === Search Latency vs. Shard Count ===
+# benchmark_search builds synthetic shards (random vectors, no API calls) and reports the
+# median and p95 latency of a fan-out search as the number of shards grows, next to a
+# sequential shard-by-shard loop for comparison.
+def benchmark_search(shard_counts=(1, 2, 4, 8, 16, 32), chunks_per_shard=2000, dim=768,
+                     num_queries=100, top_k=5):
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((num_queries, 1, dim)).astype("float32")
+    results = []
+
+    for num_shards in shard_counts:
+        corpus = ShardedCorpus()
+        for s in range(num_shards):
+            embeddings = rng.standard_normal((chunks_per_shard, dim)).astype("float32")
+            chunks = [f"shard {s} chunk {i}" for i in range(chunks_per_shard)]
+            corpus.add_shard(f"shard_{s}", chunks, embeddings)
+
+        timings = {"parallel": [], "sequential": []}
+        for query in queries:
+            start = time.perf_counter()
+            corpus.search(query, top_k)
+            timings["parallel"].append(time.perf_counter() - start)
+
+            start = time.perf_counter()
+            hits = [hit for shard in corpus.shards.values() for hit in shard.search(query, top_k)]
+            heapq.nsmallest(top_k, hits, key=lambda hit: hit[0])
+            timings["sequential"].append(time.perf_counter() - start)
+        corpus.close()
+
+        row = {"shards": num_shards}
+        for mode, values in timings.items():
+            row[f"{mode}_p50_ms"] = float(np.percentile(values, 50) * 1000)
+            row[f"{mode}_p95_ms"] = float(np.percentile(values, 95) * 1000)
+        results.append(row)
+
+    return results
+
+
+if __name__ == "__main__":
+    print(f"Fan-out search latency ({os.cpu_count()} cores, 2000 chunks/shard, dim=768):")
+    print(f"{'shards':>6} {'parallel p50':>13} {'parallel p95':>13} {'sequential p50':>15} {'sequential p95':>15}")
+    for row in benchmark_search():
+        print(
+            f"{row['shards']:>6} {row['parallel_p50_ms']:>10.2f} ms {row['parallel_p95_ms']:>10.2f} ms"
+            f" {row['sequential_p50_ms']:>12.2f} ms {row['sequential_p95_ms']:>12.2f} ms"
+        )
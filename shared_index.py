@@ -0,0 +1,278 @@
+import os
+import time
+import queue
+import shutil
+import argparse
+import tempfile
+import multiprocessing
+
+import faiss
+import numpy as np
+import psutil
+
+from chunk_store import ChunkStore, build_chunk_store
+
+# === Shared Index Across Worker Processes ===
+# One loader publishes the FAISS index and chunk store as a versioned snapshot in a common directory
+# (by default under /dev/shm, i.e. RAM-backed shared memory). Worker processes attach read-only by
+# memory-mapping the snapshot files, so every worker shares the same physical pages instead of holding
+# its own copy, and attaching costs a few mmap calls rather than a full load.
+#
+# Layout of the shared directory:
+#   CURRENT        -> name of the live snapshot, replaced atomically with os.replace
+#   v<timestamp>/  -> index.faiss + chunk store files of one published version
+#
+# A rebuilt index is published as a new version and CURRENT is switched in one rename; readers notice
+# the change on their next search and swap to it. Old versions are pruned by the publisher; readers that
+# still map them keep working because unlinked files stay mapped until they are closed.
+
+CURRENT_FILE = "CURRENT"
+INDEX_FILE = "index.faiss"
+DEFAULT_SHARED_DIR = "/dev/shm/rag_loan_index" if os.path.isdir("/dev/shm") else os.path.join(
+    tempfile.gettempdir(), "rag_loan_index")
+
+# IO_FLAG_MMAP_IFC maps flat index codes straight from the file (zero copy); older faiss only has IO_FLAG_MMAP
+MMAP_FLAG = getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP) | faiss.IO_FLAG_READ_ONLY
+
+
+# The publish_index function writes a new snapshot, points CURRENT at it, and prunes all but the
+# newest keep_versions snapshots. It returns the new version name.
+def publish_index(chunks, embeddings, shared_dir=DEFAULT_SHARED_DIR, keep_versions=2):
+    embeddings = np.ascontiguousarray(embeddings, dtype=np.float32)
+    if len(chunks) != embeddings.shape[0]:
+        raise ValueError("Each chunk needs exactly one embedding.")
+    os.makedirs(shared_dir, exist_ok=True)
+
+    version = f"v{time.time_ns()}"
+    version_dir = os.path.join(shared_dir, version)
+    build_chunk_store(chunks, version_dir)
+    index = faiss.IndexFlatL2(embeddings.shape[1])
+    index.add(embeddings)
+    faiss.write_index(index, os.path.join(version_dir, INDEX_FILE))
+
+    tmp_pointer = os.path.join(shared_dir, CURRENT_FILE + ".tmp")
+    with open(tmp_pointer, "w", encoding="utf-8") as f:
+        f.write(version)
+    os.replace(tmp_pointer, os.path.join(shared_dir, CURRENT_FILE))
+
+    versions = sorted(name for name in os.listdir(shared_dir) if name.startswith("v"))
+    for old in versions[:-keep_versions]:
+        shutil.rmtree(os.path.join(shared_dir, old), ignore_errors=True)
+    return version
+
+
+# Builds and publishes the index for a document, the same way rag_pipeline would index it
+def publish_document(file_path, api_key, shared_dir=DEFAULT_SHARED_DIR):
+    from dedup import dedup_chunks
+    from RAG_Pipeline_Step3 import load_and_clean_text, chunk_text, get_google_embeddings
+
+    chunks = [c for c in chunk_text(load_and_clean_text(file_path)) if c.strip()]
+    if not chunks:
+        raise ValueError("No valid text chunks found in the document.")
+    chunks, _ = dedup_chunks(chunks)
+    return publish_index(chunks, get_google_embeddings(chunks, api_key), shared_dir)
+
+
+def read_current_version(shared_dir):
+    try:
+        with open(os.path.join(shared_dir, CURRENT_FILE), "r", encoding="utf-8") as f:
+            return f.read().strip()
+    except FileNotFoundError:
+        raise FileNotFoundError(
+            f"No index has been published in {shared_dir} yet. "
+            f"Run `python shared_index.py publish <file> --shared-dir {shared_dir}` first."
+        ) from None
+
+
+class SharedIndexReader:
+    def __init__(self, shared_dir=DEFAULT_SHARED_DIR, check_interval=1.0):
+        self.shared_dir = shared_dir
+        self.check_interval = check_interval
+        self.version = None
+        self._snapshot = None
+        self._last_check = 0.0
+        self.refresh(force=True)
+
+    # Attaches to the version named in CURRENT if it differs from the one in use.
+    # The (index, chunks) pair is replaced in a single assignment, so a search that is already
+    # running keeps the snapshot it started with.
+    # A publisher can prune the version between reading CURRENT and opening it; the reader then keeps
+    # its current snapshot and tries again after check_interval. Only the first attach has nothing to
+    # fall back on, and raises FileNotFoundError.
+    def refresh(self, force=False):
+        now = time.monotonic()
+        if not force and now - self._last_check < self.check_interval:
+            return False
+        self._last_check = now
+
+        try:
+            version = read_current_version(self.shared_dir)
+            if version == self.version:
+                return False
+            version_dir = os.path.join(self.shared_dir, version)
+            index = faiss.read_index(os.path.join(version_dir, INDEX_FILE), MMAP_FLAG)
+            chunks = ChunkStore(version_dir)
+        except (FileNotFoundError, RuntimeError):
+            # faiss reports a missing index file as RuntimeError
+            if self._snapshot is None:
+                raise
+            return False
+        self._snapshot = (index, chunks)
+        self.version = version
+        return True
+
+    # Same contract as retrieve_chunks in RAG_Pipeline_Step3
+    def retrieve_chunks(self, query_embedding, top_k=5):
+        self.refresh()
+        index, chunks = self._snapshot
+        distances, indices = index.search(query_embedding, top_k)
+        return [chunks[i] for i in indices[0] if 0 <= i < len(chunks)]
+
+
+# === Per-Worker Memory and Attach Time ===
+# Each worker attaches (shared mode) or loads a private copy the way a worker does today
+# (faiss.read_index into memory plus a Python list of chunks), runs a few searches, and reports
+# RSS, PSS and USS. PSS splits shared pages between the processes that map them, so it shows
+# how much each worker really costs; all workers are measured at the same time through a barrier.
+def _worker(mode, shared_dir, num_queries, barrier, results):
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+
+    start = time.perf_counter()
+    if mode == "shared":
+        reader = SharedIndexReader(shared_dir)
+    else:
+        version_dir = os.path.join(shared_dir, read_current_version(shared_dir))
+        index = faiss.read_index(os.path.join(version_dir, INDEX_FILE))
+        chunks = list(ChunkStore(version_dir))
+    attach_s = time.perf_counter() - start
+
+    rng = np.random.default_rng(os.getpid())
+    dim = reader._snapshot[0].d if mode == "shared" else index.d
+    for _ in range(num_queries):
+        query = rng.standard_normal((1, dim)).astype("float32")
+        if mode == "shared":
+            reader.retrieve_chunks(query)
+        else:
+            _, indices = index.search(query, 5)
+            [chunks[i] for i in indices[0]]
+
+    barrier.wait()
+    memory = process.memory_full_info()
+    results.put({
+        "attach_ms": attach_s * 1000,
+        "rss_mb": memory.rss / 2**20,
+        "rss_delta_mb": (memory.rss - rss_before) / 2**20,
+        "pss_mb": getattr(memory, "pss", memory.rss) / 2**20,
+        "uss_mb": memory.uss / 2**20,
+    })
+    barrier.wait()
+
+
+# Waits for one report per worker, but gives up when a worker exits without reporting (e.g. it failed
+# to import in the spawned process) or when the workers take longer than timeout seconds in total,
+# instead of blocking on the queue forever.
+def _collect_reports(processes, results, timeout):
+    reports = []
+    deadline = time.monotonic() + timeout
+    while len(reports) < len(processes):
+        try:
+            reports.append(results.get(timeout=1.0))
+            continue
+        except queue.Empty:
+            pass
+        failed = [p.exitcode for p in processes if p.exitcode not in (None, 0)]
+        if failed:
+            raise RuntimeError(f"A benchmark worker exited with code {failed[0]} before reporting.")
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"Benchmark workers did not report within {timeout:.0f}s.")
+    return reports
+
+
+def benchmark_workers(worker_counts=(1, 2, 4, 8), num_chunks=50000, dim=768, num_queries=20,
+                      worker_timeout=300.0):
+    shared_dir = tempfile.mkdtemp(prefix="rag_shared_bench_", dir="/dev/shm" if os.path.isdir("/dev/shm") else None)
+    rng = np.random.default_rng(0)
+    chunks = [f"Synthetic loan chunk {i}. " * 40 for i in range(num_chunks)]
+    publish_index(chunks, rng.standard_normal((num_chunks, dim)).astype("float32"), shared_dir)
+
+    ctx = multiprocessing.get_context("spawn")
+    rows = []
+    try:
+        for mode in ("private", "shared"):
+            for workers in worker_counts:
+                barrier = ctx.Barrier(workers)
+                results = ctx.Queue()
+                processes = [
+                    ctx.Process(target=_worker, args=(mode, shared_dir, num_queries, barrier, results))
+                    for _ in range(workers)
+                ]
+                for p in processes:
+                    p.start()
+                try:
+                    reports = _collect_reports(processes, results, worker_timeout)
+                except BaseException:
+                    # the surviving workers are stuck at the barrier waiting for the failed one
+                    for p in processes:
+                        p.terminate()
+                    raise
+                finally:
+                    for p in processes:
+                        p.join()
+
+                row = {"mode": mode, "workers": workers}
+                for key in reports[0]:
+                    row[key] = float(np.mean([r[key] for r in reports]))
+                rows.append(row)
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+    return rows
+
+
+def demo_version_swap():
+    shared_dir = tempfile.mkdtemp(prefix="rag_shared_swap_")
+    try:
+        dim = 8
+        publish_index(["old chunk"], np.zeros((1, dim), dtype="float32"), shared_dir)
+        reader = SharedIndexReader(shared_dir, check_interval=0)
+        before = reader.retrieve_chunks(np.zeros((1, dim), dtype="float32"), top_k=1)
+        publish_index(["new chunk"], np.zeros((1, dim), dtype="float32"), shared_dir)
+        after = reader.retrieve_chunks(np.zeros((1, dim), dtype="float32"), top_k=1)
+        return before, after
+    finally:
+        shutil.rmtree(shared_dir, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Publish or benchmark the shared multi-process index.")
+    subcommands = parser.add_subparsers(dest="command", required=True)
+
+    publish = subcommands.add_parser("publish", help="index a document and publish it for the workers")
+    publish.add_argument("file")
+    publish.add_argument("--api-key", default=" ")
+    publish.add_argument("--shared-dir", default=DEFAULT_SHARED_DIR)
+
+    bench = subcommands.add_parser("bench", help="measure per-worker memory and attach time")
+    bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    bench.add_argument("--chunks", type=int, default=50000)
+    args = parser.parse_args()
+
+    if args.command == "publish":
+        version = publish_document(args.file, args.api_key, args.shared_dir)
+        print(f"Published {args.file} as {version} in {args.shared_dir}")
+        return
+
+    print(f"Per-worker memory with {args.chunks} chunks (dim=768), averaged over workers:")
+    print(f"{'mode':<8} {'workers':>7} {'attach':>10} {'RSS':>10} {'RSS delta':>10} {'PSS':>10} {'USS':>10}")
+    for row in benchmark_workers(tuple(args.workers), args.chunks):
+        print(
+            f"{row['mode']:<8} {row['workers']:>7} {row['attach_ms']:>7.1f} ms {row['rss_mb']:>7.1f} MB"
+            f" {row['rss_delta_mb']:>7.1f} MB {row['pss_mb']:>7.1f} MB {row['uss_mb']:>7.1f} MB"
+        )
+
+    before, after = demo_version_swap()
+    print(f"\nVersion swap without restarting the reader: {before} -> {after}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,233 @@
+import json
+import time
+import queue
+import socket
+import random
+import hashlib
+import threading
+import multiprocessing
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import numpy as np
+
+from gemini_client import (
+    GeminiClient,
+    ResilientCaller,
+    ThrottledError,
+    TransientError,
+    CallDeadlineExceeded,
+    make_callers,
+)
+
+# === Local Fault-Injecting Stub Server ===
+# A small HTTP server that stands in for the Gemini embedding and generation endpoints,
+# so the client layer and load tests can run offline against controlled latency and failures.
+#
+#   POST /embed     {"content": "..."} -> {"embedding": [...]}   (deterministic per content)
+#   POST /generate  {"prompt": "..."}  -> {"text": "..."}
+#
+# Every request sleeps for base latency; a fraction of requests are slow (tail latency),
+# throttled (HTTP 429) or fail (HTTP 500). All knobs can be changed while the server runs.
+# StubGeminiClient points the production client classes at this server; it lives here rather than in
+# gemini_client.py so that importing the real client never loads test fixtures.
+
+
+class StubConfig:
+    def __init__(self, embed_latency_ms=20, generate_latency_ms=200, slow_prob=0.0, slow_latency_ms=1000,
+                 throttle_prob=0.0, error_prob=0.0, dim=768, seed=None):
+        self.embed_latency_ms = embed_latency_ms
+        self.generate_latency_ms = generate_latency_ms
+        self.slow_prob = slow_prob
+        self.slow_latency_ms = slow_latency_ms
+        self.throttle_prob = throttle_prob
+        self.error_prob = error_prob
+        self.dim = dim
+        self.random = random.Random(seed)
+
+
+def _make_handler(config, stats, lock):
+    def count(key):
+        with lock:
+            stats[key] += 1
+
+    class StubHandler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            count("requests")
+
+            roll = config.random.random()
+            if roll < config.throttle_prob:
+                count("throttled")
+                return self._reply(429, {"error": "RESOURCE_EXHAUSTED"})
+            if roll < config.throttle_prob + config.error_prob:
+                count("errors")
+                return self._reply(500, {"error": "INTERNAL"})
+
+            latency_ms = config.embed_latency_ms if self.path == "/embed" else config.generate_latency_ms
+            if config.random.random() < config.slow_prob:
+                count("slow")
+                latency_ms = config.slow_latency_ms
+            time.sleep(latency_ms / 1000)
+
+            if self.path == "/embed":
+                digest = hashlib.sha256(body.get("content", "").encode("utf-8")).digest()
+                rng = random.Random(digest)
+                return self._reply(200, {"embedding": [rng.gauss(0, 1) for _ in range(config.dim)]})
+            if self.path == "/generate":
+                return self._reply(200, {"text": "This is a stub answer generated for load and fault testing."})
+            return self._reply(404, {"error": "NOT_FOUND"})
+
+        def _reply(self, status, payload):
+            data = json.dumps(payload).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, format, *args):
+            pass
+
+    return StubHandler
+
+
+class StubServer:
+    def __init__(self, config=None, host="127.0.0.1", port=0):
+        self.config = config or StubConfig()
+        self.stats = {"requests": 0, "throttled": 0, "errors": 0, "slow": 0}
+        self._lock = threading.Lock()
+        self.httpd = ThreadingHTTPServer((host, port), _make_handler(self.config, self.stats, self._lock))
+        self.httpd.daemon_threads = True
+        self.url = f"http://{host}:{self.httpd.server_address[1]}"
+        self._thread = None
+
+    def start(self):
+        self._thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def _serve(config, url_queue):
+    server = StubServer(config)
+    url_queue.put(server.url)
+    server.httpd.serve_forever()
+
+
+# StubProcess runs the stub server in a separate process, so its request handling (JSON encoding,
+# generating fake embeddings) does not compete with the caller for the GIL and is not counted in
+# the caller's CPU and memory. Request stats stay in the child process and are not available here.
+class StubProcess:
+    def __init__(self, config=None, startup_timeout=30.0):
+        self.config = config or StubConfig()
+        self.startup_timeout = startup_timeout
+        self.url = None
+        self._process = None
+
+    def start(self):
+        url_queue = multiprocessing.Queue()
+        self._process = multiprocessing.Process(target=_serve, args=(self.config, url_queue), daemon=True)
+        self._process.start()
+        try:
+            self.url = url_queue.get(timeout=self.startup_timeout)
+        except queue.Empty:
+            self.stop()
+            raise RuntimeError(f"Stub server process did not start (exit code {self._process.exitcode}).")
+        return self
+
+    def stop(self):
+        if self._process is not None and self._process.is_alive():
+            self._process.terminate()
+        if self._process is not None:
+            self._process.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# post_json sends one request to the stub and raises urllib.error.HTTPError on 429/500,
+# or a timeout error when the server does not answer within `timeout` seconds.
+def post_json(url, payload, timeout=None):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode("utf-8"), headers={"Content-Type": "application/json"}
+    )
+    with urllib.request.urlopen(request, timeout=timeout) as response:
+        return json.loads(response.read())
+
+
+# === Stub Backend Client ===
+# StubGeminiClient talks to the local stub server instead of the Gemini API and maps its HTTP
+# failures onto the same error types, so the resilience logic is exercised exactly as in production.
+class StubGeminiClient(GeminiClient):
+    def __init__(self, url, embed_caller=None, generate_caller=None):
+        self.url = url
+        self.embed_caller, self.generate_caller = make_callers(embed_caller, generate_caller)
+
+    def _embed(self, content, task_type, timeout=None):
+        return self._post("/embed", {"content": content, "task_type": task_type}, timeout)["embedding"]
+
+    def _generate(self, prompt, timeout=None):
+        return self._post("/generate", {"prompt": prompt}, timeout)["text"].strip()
+
+    def _post(self, path, payload, timeout):
+        try:
+            return post_json(self.url + path, payload, timeout=timeout)
+        except urllib.error.HTTPError as e:
+            if e.code == 429:
+                raise ThrottledError("Stub server throttled the request.") from e
+            if e.code >= 500:
+                raise TransientError(f"Stub server returned HTTP {e.code}.") from e
+            raise
+        except (socket.timeout, TimeoutError) as e:
+            raise CallDeadlineExceeded("Stub server did not answer in time.") from e
+
+
+# === Tail Latency Benchmark ===
+# Sends the same embedding workload to a stub server with injected tail latency and throttling,
+# once without hedging and once with it, and reports latency percentiles for each run.
+def benchmark_hedging(num_calls=1000, concurrency=8, config=None):
+    config = config or StubConfig(embed_latency_ms=20, slow_prob=0.03, slow_latency_ms=500,
+                                  throttle_prob=0.01, error_prob=0.01, seed=0)
+    results = {}
+    with StubServer(config) as server:
+        for hedge in (False, True):
+            caller = ResilientCaller(deadline=5.0, base_delay=0.05, hedge=hedge)
+            client = StubGeminiClient(server.url, embed_caller=caller)
+
+            def timed_embed(i):
+                start = time.perf_counter()
+                client.embed(f"benchmark chunk {i}")
+                return time.perf_counter() - start
+
+            with ThreadPoolExecutor(max_workers=concurrency) as pool:
+                latencies = list(pool.map(timed_embed, range(num_calls)))
+
+            label = "hedged" if hedge else "unhedged"
+            results[label] = {f"p{p}_ms": float(np.percentile(latencies, p) * 1000) for p in (50, 95, 99)}
+            results[label].update(caller.stats)
+    return results
+
+
+if __name__ == "__main__":
+    with StubServer(StubConfig(slow_prob=0.05, throttle_prob=0.02, error_prob=0.01)) as server:
+        print(f"Stub server listening on {server.url} (Ctrl+C to stop)")
+        try:
+            while True:
+                time.sleep(1)
+        except KeyboardInterrupt:
+            print("Stats:", server.stats)
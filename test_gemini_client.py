@@ -0,0 +1,252 @@
+import os
+import time
+import threading
+import multiprocessing
+
+import gemini_client
+from gemini_client import (
+    CircuitBreaker,
+    CircuitOpenError,
+    CallDeadlineExceeded,
+    ResilientCaller,
+    ThrottledError,
+    TransientError,
+    get_client,
+    register_client,
+)
+from stub_server import StubConfig, StubServer, StubGeminiClient
+
+# === Resilience Checks ===
+# Checks the retry, deadline, hedging and circuit-breaker behaviour of ResilientCaller, first with
+# plain functions that fail on cue and then end to end against the fault-injecting stub server.
+# Runs under pytest, or on its own with `python test_gemini_client.py`.
+
+
+# Returns a fn for ResilientCaller.call that raises each error in `errors` in turn, then succeeds
+def flaky(errors, result="ok"):
+    calls = []
+
+    def fn(timeout=None):
+        calls.append(timeout)
+        if len(calls) <= len(errors):
+            raise errors[len(calls) - 1]
+        return result
+
+    return fn, calls
+
+
+def test_retries_until_success():
+    caller = ResilientCaller(base_delay=0.001, hedge=False)
+    fn, calls = flaky([TransientError("boom"), ThrottledError("slow down")])
+    assert caller.call(fn) == "ok"
+    assert len(calls) == 3
+    assert caller.stats["retries"] == 2
+    assert caller.breaker.state == "closed" and caller.breaker.failures == 0
+
+
+def test_gives_up_after_max_retries():
+    caller = ResilientCaller(max_retries=3, base_delay=0.001, hedge=False)
+    fn, calls = flaky([TransientError("boom")] * 10)
+    try:
+        caller.call(fn)
+        raise AssertionError("expected TransientError")
+    except TransientError:
+        pass
+    assert len(calls) == 4
+    assert caller.stats["retries"] == 3
+
+
+def test_non_retryable_error_is_not_retried():
+    caller = ResilientCaller(base_delay=0.001, hedge=False)
+    fn, calls = flaky([ValueError("bad request")])
+    try:
+        caller.call(fn)
+        raise AssertionError("expected ValueError")
+    except ValueError:
+        pass
+    assert len(calls) == 1
+    assert caller.breaker.failures == 0
+
+
+def test_retries_inside_one_call_count_as_one_breaker_failure():
+    caller = ResilientCaller(max_retries=4, base_delay=0.001, hedge=False,
+                             breaker=CircuitBreaker(failure_threshold=2))
+    fn, calls = flaky([ThrottledError("slow down")] * 10)
+    try:
+        caller.call(fn)
+    except ThrottledError:
+        pass
+    assert len(calls) == 5
+    assert caller.breaker.failures == 1
+    assert caller.breaker.state == "closed"
+
+
+def test_deadline_covers_the_whole_call():
+    caller = ResilientCaller(deadline=0.3, max_retries=10, base_delay=0.5, hedge=False)
+
+    def slow(timeout=None):
+        time.sleep(0.2)
+        raise TransientError("boom")
+
+    start = time.monotonic()
+    try:
+        caller.call(slow)
+        raise AssertionError("expected the call to fail")
+    except (TransientError, CallDeadlineExceeded):
+        pass
+    assert time.monotonic() - start < 0.45
+
+
+def test_deadline_on_a_hung_request():
+    caller = ResilientCaller(deadline=0.2, max_retries=0, hedge=False)
+    start = time.monotonic()
+    try:
+        caller.call(lambda timeout=None: time.sleep(1.0))
+        raise AssertionError("expected CallDeadlineExceeded")
+    except CallDeadlineExceeded:
+        pass
+    assert time.monotonic() - start < 0.35
+
+
+def test_breaker_opens_then_fails_fast():
+    caller = ResilientCaller(max_retries=0, hedge=False,
+                             breaker=CircuitBreaker(failure_threshold=3, reset_timeout=60))
+    fn, calls = flaky([TransientError("boom")] * 10)
+    for _ in range(3):
+        try:
+            caller.call(fn)
+        except TransientError:
+            pass
+    assert caller.breaker.state == "open"
+
+    try:
+        caller.call(fn)
+        raise AssertionError("expected CircuitOpenError")
+    except CircuitOpenError:
+        pass
+    assert len(calls) == 3
+    assert caller.stats["rejected"] == 1
+
+
+def test_half_open_lets_exactly_one_probe_through():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.05)
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+    time.sleep(0.06)
+
+    admitted = []
+    barrier = threading.Barrier(10)
+
+    def contender():
+        barrier.wait()
+        admitted.append(breaker.allow())
+
+    threads = [threading.Thread(target=contender) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert admitted.count(True) == 1
+    assert breaker.state == "half_open"
+
+
+def test_half_open_probe_outcome_closes_or_reopens():
+    breaker = CircuitBreaker(failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_failure()
+    assert breaker.state == "open" and not breaker.allow()
+
+    time.sleep(0.02)
+    assert breaker.allow()
+    breaker.record_success()
+    assert breaker.state == "closed" and breaker.allow() and breaker.allow()
+
+
+def test_hedge_wins_over_a_slow_first_request():
+    caller = ResilientCaller(hedge_min_samples=5, max_retries=0)
+    for _ in range(5):
+        caller.latency.record(0.01)
+    calls = []
+
+    def fn(timeout=None):
+        calls.append(timeout)
+        time.sleep(1.0 if len(calls) == 1 else 0.01)
+        return len(calls)
+
+    start = time.monotonic()
+    assert caller.call(fn) == 2
+    assert time.monotonic() - start < 0.5
+    assert caller.stats["hedges"] == 1 and caller.stats["hedge_wins"] == 1
+
+
+def test_stub_throttling_is_retried_then_surfaced():
+    with StubServer(StubConfig(throttle_prob=1.0)) as server:
+        caller = ResilientCaller(max_retries=2, base_delay=0.001, hedge=False)
+        client = StubGeminiClient(server.url, embed_caller=caller)
+        try:
+            client.embed("chunk")
+            raise AssertionError("expected ThrottledError")
+        except ThrottledError:
+            pass
+        assert server.stats["requests"] == 3
+        assert caller.breaker.failures == 1
+
+
+def test_stub_breaker_stops_traffic_to_a_failing_backend():
+    with StubServer(StubConfig(error_prob=1.0)) as server:
+        caller = ResilientCaller(max_retries=0, breaker=CircuitBreaker(failure_threshold=5, reset_timeout=60))
+        client = StubGeminiClient(server.url, embed_caller=caller)
+        for i in range(50):
+            try:
+                client.embed(f"chunk {i}")
+            except (TransientError, CircuitOpenError):
+                pass
+        assert server.stats["requests"] == 5
+        assert caller.stats["rejected"] == 45
+
+
+def test_generations_are_not_hedged_against_embedding_latency():
+    with StubServer(StubConfig(embed_latency_ms=5, generate_latency_ms=100, seed=0)) as server:
+        client = StubGeminiClient(server.url)
+        for round_ in range(5):
+            for i in range(40):
+                client.embed(f"chunk {round_}-{i}")
+            client.generate("prompt")
+        assert client.generate_caller.stats["hedges"] == 0
+        assert len(client.generate_caller.latency) == 5
+        assert client.embed_caller.breaker is client.generate_caller.breaker
+
+
+def _child_sees_no_clients(api_key, results):
+    results.put(api_key in gemini_client._clients)
+
+
+def test_forked_child_does_not_inherit_clients():
+    if not hasattr(os, "fork"):
+        return
+    with StubServer() as server:
+        register_client("fork-check", StubGeminiClient(server.url))
+        get_client("fork-check").embed("warm up the caller's thread pool")
+
+        ctx = multiprocessing.get_context("fork")
+        results = ctx.Queue()
+        child = ctx.Process(target=_child_sees_no_clients, args=("fork-check", results))
+        child.start()
+        inherited = results.get(timeout=10)
+        child.join(10)
+        assert not inherited
+
+
+if __name__ == "__main__":
+    checks = [(name, fn) for name, fn in list(globals().items()) if name.startswith("test_") and callable(fn)]
+    failed = 0
+    for name, check in checks:
+        try:
+            check()
+            print(f"PASS  {name}")
+        except Exception as e:
+            failed += 1
+            print(f"FAIL  {name}: {type(e).__name__}: {e}")
+    print(f"\n{len(checks) - failed}/{len(checks)} checks passed")